@@ -1,16 +1,16 @@
 import os
 import cv2
-import time
+import math
 import argparse
-import numpy as np
 
 import torch
+from torchvision.ops import nms
 
 from layers import PriorBox
 from config import get_config
 from models import RetinaFace
 from utils.general import draw_detections
-from utils.box_utils import decode, decode_landmarks, nms
+from utils.box_utils import decode, decode_landmarks
 
 
 def parse_arguments():
@@ -33,6 +33,27 @@ def parse_arguments():
         ],
         help='Backbone network architecture to use'
     )
+    parser.add_argument(
+        '--engine',
+        type=str,
+        default=None,
+        help='Path to a TensorRT engine built by export_trt.py, used instead of the PyTorch weights'
+    )
+    parser.add_argument(
+        '--fp16',
+        action='store_true',
+        help='Run the PyTorch forward pass under FP16 autocast (CUDA only)'
+    )
+    parser.add_argument(
+        '--jit',
+        action='store_true',
+        help='Trace, freeze and optimize the PyTorch model with TorchScript before inference'
+    )
+    parser.add_argument(
+        '--compile',
+        action='store_true',
+        help='Compile the PyTorch model with torch.compile (dynamic shapes, no CUDA graphs)'
+    )
 
     # Detection settings
     parser.add_argument(
@@ -80,73 +101,61 @@ def parse_arguments():
         default='./assets/test.jpg',
         help='Path to the input image'
     )
+    parser.add_argument(
+        '--image-dir',
+        type=str,
+        default=None,
+        help='Directory of images to process instead of --image-path'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=1,
+        help='Number of images per forward pass when using --image-dir'
+    )
 
-    return parser.parse_args()
-
-
-@torch.no_grad()
-def inference(model, image):
-    model.eval()
-    loc, conf, landmarks = model(image)
-
-    loc = loc.squeeze(0)
-    conf = conf.squeeze(0)
-    landmarks = landmarks.squeeze(0)
-
-    return loc, conf, landmarks
-
-
-
-
-def main(params):
-    # load configuration and device setup
-    cfg = get_config(params.network)
-    if cfg is None:
-        raise KeyError(f"Config file for {params.network} not found!")
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    rgb_mean = (104, 117, 123)
-    resize_factor = 1
-
-    # model initialization
-    model = RetinaFace(cfg=cfg)
-    model.to(device)
-    model.eval()
-
-    # loading state_dict
-    state_dict = torch.load(params.weights, map_location=device, weights_only=True)
-    model.load_state_dict(state_dict)
-    print("Model loaded successfully!")
-
-    # read image
-    original_image = cv2.imread(params.image_path, cv2.IMREAD_COLOR)
-    image = np.float32(original_image)
-    img_height, img_width, _ = image.shape
-
-    # normalize image
-    image -= rgb_mean
-    image = image.transpose(2, 0, 1)  # HWC -> CHW
-    image = torch.from_numpy(image).unsqueeze(0)  # 1CHW
-    image = image.to(device)
+    args = parser.parse_args()
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
 
-    # forward pass
-    loc, conf, landmarks = inference(model, image)
+    return args
 
-    # generate anchor boxes
-    priorbox = PriorBox(cfg, image_size=(img_height, img_width))
-    priors = priorbox.generate_anchors().to(device)
 
+@torch.no_grad()
+def inference(model, image, fp16=False):
+    with torch.autocast(device_type=image.device.type, dtype=torch.float16, enabled=fp16):
+        loc, conf, landmarks = model(image)
+
+    # decoding stays in FP32
+    return loc.float(), conf.float(), landmarks.float()
+
+
+def postprocess(loc, conf, landmarks, priors, bbox_scale, landmark_scale, cfg, params):
+    """
+    Decodes the predictions of a single image and filters them with confidence threshold and NMS.
+
+    Args:
+        loc (torch.Tensor): Location predictions, shape: [num_priors, 4].
+        conf (torch.Tensor): Class probabilities, shape: [num_priors, 2].
+        landmarks (torch.Tensor): Landmark predictions, shape: [num_priors, 10].
+        priors (torch.Tensor): Anchor boxes, shape: [num_priors, 4].
+        bbox_scale (torch.Tensor): Box scale [width, height] * 2, shape: [4].
+        landmark_scale (torch.Tensor): Landmark scale [width, height] * 5, shape: [10].
+        cfg (dict): Model configuration.
+        params (argparse.Namespace): Detection settings.
+
+    Returns:
+        ndarray: Detections, shape: [num_detections, 15] as [x1, y1, x2, y2, score, 5 x (x, y) landmarks].
+    """
     # decode boxes and landmarks
     boxes = decode(loc, priors, cfg['variance'])
     landmarks = decode_landmarks(landmarks, priors, cfg['variance'])
 
-    # scale adjustments
-    bbox_scale = torch.tensor([img_width, img_height] * 2, device=device)
-    boxes = (boxes * bbox_scale / resize_factor).cpu().numpy()
-
-    landmark_scale = torch.tensor([img_width, img_height] * 5, device=device)
-    landmarks = (landmarks * landmark_scale / resize_factor).cpu().numpy()
+    # scale adjustments (in place on the freshly decoded tensors)
+    boxes = boxes.mul_(bbox_scale)
+    landmarks = landmarks.mul_(landmark_scale)
 
-    scores = conf.cpu().numpy()[:, 1]
+    scores = conf[:, 1]
 
     # filter by confidence threshold
     inds = scores > params.conf_threshold
@@ -154,32 +163,130 @@ def main(params):
     landmarks = landmarks[inds]
     scores = scores[inds]
 
-    # sort by scores
-    order = scores.argsort()[::-1][:params.pre_nms_topk]
-    boxes, landmarks, scores = boxes[order], landmarks[order], scores[order]
+    # ranking and NMS only matter when several candidates survive
+    if scores.numel() > 1:
+        # keep top-k scores (sorted in descending order)
+        scores, order = scores.topk(min(params.pre_nms_topk, scores.numel()))
+        boxes, landmarks = boxes[order], landmarks[order]
 
-    # apply NMS
-    detections = np.hstack((boxes, scores[:, np.newaxis])).astype(np.float32, copy=False)
-    keep = nms(detections, params.nms_threshold)
+        # apply NMS and keep top-k detections and landmarks
+        keep = nms(boxes, scores, params.nms_threshold)[:params.post_nms_topk]
+        boxes, landmarks, scores = boxes[keep], landmarks[keep], scores[keep]
 
-    detections = detections[keep]
-    landmarks = landmarks[keep]
+    # concatenate detections and landmarks, copying only the kept rows to host
+    return torch.cat((boxes, scores[:, None], landmarks), dim=1).cpu().numpy()
 
-    # keep top-k detections and landmarks
-    detections = detections[:params.post_nms_topk]
-    landmarks = landmarks[:params.post_nms_topk]
 
-    # concatenate detections and landmarks
-    detections = np.concatenate((detections, landmarks), axis=1)
+def main(params):
+    # load configuration and device setup
+    cfg = get_config(params.network)
+    if cfg is None:
+        raise KeyError(f"Config file for {params.network} not found!")
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
-    # show image
-    if params.save_image:
-        draw_detections(original_image, detections, params.vis_threshold)
-        # save image
-        im_name = os.path.splitext(os.path.basename(params.image_path))[0]
-        save_name = f"{im_name}_{params.network}_out.jpg"
-        cv2.imwrite(save_name, original_image)
-        print(f"Image saved at '{save_name}'")
+    # allow TF32 on Ampere+; cuDNN autotuning is left off since input shapes vary between runs and batches
+    torch.backends.cudnn.allow_tf32 = True
+    torch.backends.cuda.matmul.allow_tf32 = True
+
+    rgb_mean = torch.tensor([104, 117, 123], dtype=torch.float32, device=device).view(3, 1, 1)
+
+    if params.engine:
+        from utils.trt_engine import TRTEngine
+
+        model = TRTEngine(params.engine, device)
+        print("TensorRT engine loaded successfully!")
+    else:
+        # model initialization
+        model = RetinaFace(cfg=cfg)
+        model.to(device)
+        model.eval()
+
+        # loading state_dict
+        state_dict = torch.load(params.weights, map_location=device, weights_only=True)
+        model.load_state_dict(state_dict)
+        print("Model loaded successfully!")
+
+    if params.fp16 and device.type != "cuda":
+        raise ValueError("--fp16 requires a CUDA device")
+
+    if params.jit:
+        if params.engine or params.fp16:
+            raise ValueError("--jit cannot be combined with --engine or --fp16")
+        # freezing inlines the weights, folding constants and conv-bn pairs
+        with torch.no_grad():
+            model = torch.jit.trace(model, torch.zeros((1, 3, 640, 640), device=device))
+            model = torch.jit.freeze(model)
+            model = torch.jit.optimize_for_inference(model)
+        print("Model optimized with TorchScript!")
+
+    if params.compile:
+        if params.engine or params.jit:
+            raise ValueError("--compile cannot be combined with --engine or --jit")
+        # image sizes vary, so let Dynamo mark changing dims dynamic instead of recompiling (and
+        # recording a new CUDA graph with "reduce-overhead") for every new batch shape
+        model = torch.compile(model, fullgraph=False, dynamic=None)
+
+    if params.image_dir:
+        image_paths = sorted(
+            os.path.join(params.image_dir, f) for f in os.listdir(params.image_dir)
+            if f.lower().endswith(('.jpg', '.jpeg', '.png'))
+        )
+    else:
+        image_paths = [params.image_path]
+
+    # flat input buffer reused across batches, grown when a larger batch arrives
+    input_buffer = torch.empty(0, dtype=torch.float32, device=device)
+
+    for start in range(0, len(image_paths), params.batch_size):
+        # read images, skipping unreadable files
+        batch_paths, original_images = [], []
+        for image_path in image_paths[start:start + params.batch_size]:
+            original_image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+            if original_image is None:
+                print(f"Warning: Skipping unreadable image '{image_path}'")
+                continue
+            batch_paths.append(image_path)
+            original_images.append(original_image)
+        if not original_images:
+            continue
+
+        img_height = max(image.shape[0] for image in original_images)
+        img_width = max(image.shape[1] for image in original_images)
+
+        input_shape = (len(original_images), 3, img_height, img_width)
+        if input_buffer.numel() < math.prod(input_shape):
+            input_buffer = torch.empty(math.prod(input_shape), dtype=torch.float32, device=device)
+        image = input_buffer[:math.prod(input_shape)].view(input_shape)
+
+        # zero-pad (in normalized space) to a common shape at the bottom/right, so box coordinates are unaffected
+        image.zero_()
+        for i, original_image in enumerate(original_images):
+            height, width, _ = original_image.shape
+
+            # upload uint8 image, then cast and HWC -> CHW into the buffer and normalize in place
+            frame = torch.from_numpy(original_image).to(device)
+            image[i, :, :height, :width].copy_(frame.permute(2, 0, 1)).sub_(rgb_mean)
+
+        # forward pass
+        loc, conf, landmarks = inference(model, image, fp16=params.fp16)
+
+        # generate anchor boxes and the pixel scales shared by every image in the batch
+        priorbox = PriorBox(cfg, image_size=(img_height, img_width))
+        priors = priorbox.generate_anchors().to(device)
+        bbox_scale = torch.tensor([img_width, img_height] * 2, dtype=torch.float32, device=device)
+        landmark_scale = torch.tensor([img_width, img_height] * 5, dtype=torch.float32, device=device)
+
+        for i, (image_path, original_image) in enumerate(zip(batch_paths, original_images)):
+            detections = postprocess(loc[i], conf[i], landmarks[i], priors, bbox_scale, landmark_scale, cfg, params)
+
+            # show image
+            if params.save_image:
+                draw_detections(original_image, detections, params.vis_threshold)
+                # save image
+                im_name = os.path.splitext(os.path.basename(image_path))[0]
+                save_name = f"{im_name}_{params.network}_out.jpg"
+                cv2.imwrite(save_name, original_image)
+                print(f"Image saved at '{save_name}'")
 
 
 if __name__ == '__main__':
@@ -157,20 +157,20 @@ def main(params):
         boxes = decode(loc, priors, cfg['variance'])
         landmarks = decode_landmarks(landmarks, priors, cfg['variance'])
 
-        # scale adjustments
-        bbox_scale = torch.tensor([img_width, img_height] * 2, device=device)
-        boxes = (boxes * bbox_scale / resize_factor).cpu().numpy()
+        # scale adjustments, with the resize factor folded into the scale
+        bbox_scale = torch.tensor([img_width, img_height] * 2, dtype=torch.float32, device=device) / resize_factor
+        boxes = boxes.mul_(bbox_scale)
 
-        landmark_scale = torch.tensor([img_width, img_height] * 5, device=device)
-        landmarks = (landmarks * landmark_scale / resize_factor).cpu().numpy()
+        landmark_scale = torch.tensor([img_width, img_height] * 5, dtype=torch.float32, device=device) / resize_factor
+        landmarks = landmarks.mul_(landmark_scale)
 
-        scores = conf.cpu().numpy()[:, 1]
+        scores = conf[:, 1]
 
-        # filter by confidence threshold
+        # filter by confidence threshold on device, then copy only the survivors to host
         inds = scores > params.conf_threshold
-        boxes = boxes[inds]
-        landmarks = landmarks[inds]
-        scores = scores[inds]
+        boxes = boxes[inds].cpu().numpy()
+        landmarks = landmarks[inds].cpu().numpy()
+        scores = scores[inds].cpu().numpy()
 
         # sort by scores
         order = scores.argsort()[::-1]
@@ -0,0 +1,305 @@
+import os
+import cv2
+import hashlib
+import argparse
+import numpy as np
+import tensorrt as trt
+
+import torch
+
+from onnx_export import onnx_export
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='TensorRT Export')
+
+    parser.add_argument(
+        '-w', '--weights',
+        default='./weights/last.pth',
+        type=str,
+        help='Trained state_dict file path to open'
+    )
+    parser.add_argument(
+        '-n', '--network',
+        type=str,
+        default='mobilenetv1',
+        choices=[
+            'mobilenetv1', 'mobilenetv1_0.25', 'mobilenetv1_0.50',
+            'mobilenetv2', 'resnet50', 'resnet34', 'resnet18'
+        ],
+        help='Backbone network architecture to use'
+    )
+
+    # Engine options
+    parser.add_argument(
+        '--fp16',
+        action='store_true',
+        help='Allow TensorRT to use FP16 kernels'
+    )
+    parser.add_argument(
+        '--int8',
+        action='store_true',
+        help='Quantize the engine to INT8 with post-training calibration (detection heads stay in FP16)'
+    )
+    parser.add_argument(
+        '--calib-dir',
+        type=str,
+        default='./data/widerface/train/images',
+        help='Directory of images used for INT8 calibration'
+    )
+    parser.add_argument(
+        '--calib-images',
+        type=int,
+        default=500,
+        help='Number of images used for INT8 calibration'
+    )
+    parser.add_argument(
+        '--calib-cache',
+        type=str,
+        default=None,
+        help=(
+            'INT8 calibration cache file, reused as-is if it exists. The default, '
+            '<weights name>_<hash>.cache, is keyed on the weights file contents, --network, '
+            '--calib-dir, --calib-images and --opt-shape'
+        )
+    )
+    parser.add_argument(
+        '--sparsity',
+        action='store_true',
+        help='Allow sparse Tensor Core kernels for 2:4 sparse weights (Ampere and newer)'
+    )
+    parser.add_argument(
+        '--opt-batch-size',
+        type=int,
+        default=1,
+        help='Batch size the engine is tuned for'
+    )
+    parser.add_argument(
+        '--max-batch-size',
+        type=int,
+        default=16,
+        help='Largest batch size supported by the engine'
+    )
+    parser.add_argument(
+        '--min-shape',
+        type=int,
+        nargs=2,
+        default=[320, 320],
+        metavar=('HEIGHT', 'WIDTH'),
+        help='Smallest input size supported by the engine'
+    )
+    parser.add_argument(
+        '--opt-shape',
+        type=int,
+        nargs=2,
+        default=[640, 640],
+        metavar=('HEIGHT', 'WIDTH'),
+        help='Input size the engine is tuned for'
+    )
+    parser.add_argument(
+        '--max-shape',
+        type=int,
+        nargs=2,
+        default=[1920, 1920],
+        metavar=('HEIGHT', 'WIDTH'),
+        help='Largest input size supported by the engine'
+    )
+    parser.add_argument(
+        '--workspace',
+        type=int,
+        default=4,
+        help='Builder workspace size in GiB'
+    )
+
+    return parser.parse_args()
+
+
+class EntropyCalibrator(trt.IInt8EntropyCalibrator2):
+    """
+    Feeds preprocessed calibration images to TensorRT for INT8 post-training quantization.
+
+    Args:
+        image_dir (str): Directory searched recursively for calibration images.
+        num_images (int): Maximum number of images to use.
+        input_shape (tuple[int, int]): Calibration input size as (height, width).
+        cache_file (str): Calibration cache file, read if it exists and written after calibration.
+    """
+
+    def __init__(self, image_dir, num_images, input_shape, cache_file):
+        super().__init__()
+        self.input_shape = input_shape
+        self.cache_file = cache_file
+        self.rgb_mean = np.array([104, 117, 123], dtype=np.float32)
+
+        image_paths = []
+        for root, _, files in os.walk(image_dir):
+            image_paths += [os.path.join(root, f) for f in files if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+        self.image_paths = sorted(image_paths)[:num_images]
+        self.index = 0
+
+        if not self.image_paths and not os.path.exists(cache_file):
+            raise ValueError(
+                f"No calibration images (.jpg/.jpeg/.png) found in '{image_dir}' and no calibration "
+                f"cache at '{cache_file}'. Set --calib-dir to a directory of images."
+            )
+
+        self.device_input = torch.empty((1, 3, *input_shape), dtype=torch.float32, device="cuda")
+
+    def preprocess(self, image_path):
+        image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if image is None:
+            return None
+        height, width = self.input_shape
+
+        # aspect-ratio preserving resize onto a zero-padded canvas
+        scale = min(height / image.shape[0], width / image.shape[1])
+        new_height, new_width = int(image.shape[0] * scale), int(image.shape[1] * scale)
+        canvas = np.zeros((height, width, 3), dtype=np.float32)
+        canvas[:new_height, :new_width] = cv2.resize(image, (new_width, new_height))
+
+        canvas -= self.rgb_mean
+        return canvas.transpose(2, 0, 1)  # HWC -> CHW
+
+    def get_batch_size(self):
+        return 1
+
+    def get_batch(self, names):
+        # called from TensorRT, so unreadable images are skipped rather than raising
+        while self.index < len(self.image_paths):
+            image_path = self.image_paths[self.index]
+            self.index += 1
+
+            image = self.preprocess(image_path)
+            if image is None:
+                print(f"Warning: Skipping unreadable calibration image '{image_path}'")
+                continue
+
+            self.device_input.copy_(torch.from_numpy(image).unsqueeze(0))
+            return [self.device_input.data_ptr()]
+
+        return None
+
+    def read_calibration_cache(self):
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file, 'rb') as f:
+                return f.read()
+        return None
+
+    def write_calibration_cache(self, cache):
+        with open(self.cache_file, 'wb') as f:
+            f.write(cache)
+
+
+def build_engine(params, onnx_model, engine_file, calib_cache=None):
+    """
+    Builds a serialized TensorRT engine from an ONNX model.
+
+    Args:
+        params (argparse.Namespace): Export arguments (precision, input shapes, workspace size).
+        onnx_model (str): Path to the ONNX model.
+        engine_file (str): Path where the serialized engine is written.
+        calib_cache (str, optional): INT8 calibration cache file, required with `--int8`.
+    """
+    logger = trt.Logger(trt.Logger.WARNING)
+    builder = trt.Builder(logger)
+    network = builder.create_network(1 << int(trt.NetworkDefinitionCreationFlag.EXPLICIT_BATCH))
+    parser = trt.OnnxParser(network, logger)
+
+    with open(onnx_model, 'rb') as f:
+        if not parser.parse(f.read()):
+            errors = "\n".join(str(parser.get_error(i)) for i in range(parser.num_errors))
+            raise RuntimeError(f"Failed to parse ONNX model '{onnx_model}':\n{errors}")
+
+    config = builder.create_builder_config()
+    config.set_memory_pool_limit(trt.MemoryPoolType.WORKSPACE, params.workspace << 30)
+    if params.fp16:
+        if not builder.platform_has_fast_fp16:
+            print("Warning: FP16 is not natively supported on this platform")
+        config.set_flag(trt.BuilderFlag.FP16)
+
+    if params.int8:
+        if not builder.platform_has_fast_int8:
+            print("Warning: INT8 is not natively supported on this platform")
+        # FP16 is the fallback for layers without INT8 kernels and for the detection heads
+        config.set_flag(trt.BuilderFlag.INT8)
+        config.set_flag(trt.BuilderFlag.FP16)
+        config.int8_calibrator = EntropyCalibrator(
+            params.calib_dir,
+            params.calib_images,
+            tuple(params.opt_shape),
+            calib_cache
+        )
+
+        # keep the localization/landmark regressions and classification in FP16 to protect accuracy
+        config.set_flag(trt.BuilderFlag.OBEY_PRECISION_CONSTRAINTS)
+        for i in range(network.num_layers):
+            layer = network.get_layer(i)
+            if not any(head in layer.name for head in ('class_head', 'bbox_head', 'landmark_head')):
+                continue
+
+            # the heads also contain integer shape arithmetic for `view(batch, -1, n)`; pin only float compute
+            outputs = [layer.get_output(j) for j in range(layer.num_outputs)]
+            if layer.type == trt.LayerType.SHAPE or not all(o.dtype in (trt.float32, trt.float16) for o in outputs):
+                continue
+
+            layer.precision = trt.float16
+            for j, output in enumerate(outputs):
+                # network outputs keep their FP32 binding; TensorRT reformats at the boundary
+                if not output.is_network_output:
+                    layer.set_output_type(j, trt.float16)
+
+    if params.sparsity:
+        config.set_flag(trt.BuilderFlag.SPARSE_WEIGHTS)
+
+    # a single optimization profile covers every batch and input size between min and max
+    profile = builder.create_optimization_profile()
+    profile.set_shape(
+        'input',
+        (1, 3, *params.min_shape),
+        (params.opt_batch_size, 3, *params.opt_shape),
+        (params.max_batch_size, 3, *params.max_shape)
+    )
+    config.add_optimization_profile(profile)
+    if params.int8:
+        # the calibrator feeds single images of `opt_shape`
+        calib_profile = builder.create_optimization_profile()
+        calib_shape = (1, 3, *params.opt_shape)
+        calib_profile.set_shape('input', calib_shape, calib_shape, calib_shape)
+        config.set_calibration_profile(calib_profile)
+
+    print(f"==> Building TensorRT engine at '{engine_file}'")
+    serialized_engine = builder.build_serialized_network(network, config)
+    if serialized_engine is None:
+        raise RuntimeError("Failed to build TensorRT engine")
+
+    with open(engine_file, 'wb') as f:
+        f.write(serialized_engine)
+
+
+def trt_export(params):
+    fname = os.path.splitext(os.path.basename(params.weights))[0]
+    # separate name so the output of onnx_export.py is not overwritten
+    onnx_model = f'{fname}_trt.onnx'
+    engine_file = f'{fname}.engine'
+
+    if params.calib_cache:
+        calib_cache = params.calib_cache
+    else:
+        # key the default cache on the model and calibration inputs so changing any of them recalibrates
+        calib_hash = hashlib.md5()
+        with open(params.weights, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                calib_hash.update(chunk)
+        calib_key = f"{params.network}|{os.path.abspath(params.calib_dir)}|{params.calib_images}|{params.opt_shape}"
+        calib_hash.update(calib_key.encode())
+        calib_cache = f'{fname}_{calib_hash.hexdigest()[:8]}.cache'
+
+    onnx_export(params, onnx_model=onnx_model, opset_version=17, input_size=tuple(params.opt_shape))
+    build_engine(params, onnx_model, engine_file, calib_cache)
+
+    print(f"Model exported successfully to {engine_file}")
+
+
+if __name__ == '__main__':
+    args = parse_arguments()
+    trt_export(args)
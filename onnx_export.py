@@ -30,7 +30,16 @@ def parse_arguments():
 
 
 @torch.no_grad()
-def onnx_export(params):
+def onnx_export(params, onnx_model=None, opset_version=11, input_size=(640, 640)):
+    """
+    Loads the trained model and exports it to ONNX.
+
+    Args:
+        params (argparse.Namespace): Arguments with `network` and `weights`.
+        onnx_model (str, optional): Output file path, defaults to `<weights name>.onnx`.
+        opset_version (int): ONNX opset version to export to.
+        input_size (tuple[int, int]): Dummy input size as (height, width).
+    """
     # Get model configuration
     cfg = get_config(params.network)
     if cfg is None:
@@ -52,12 +61,13 @@ def onnx_export(params):
     model.eval()
 
     # Generate output filename
-    fname = os.path.splitext(os.path.basename(params.weights))[0]
-    onnx_model = f'{fname}.onnx'
+    if onnx_model is None:
+        fname = os.path.splitext(os.path.basename(params.weights))[0]
+        onnx_model = f'{fname}.onnx'
     print(f"==> Exporting model to ONNX format at '{onnx_model}'")
 
-    # Create dummy input (batch_size=1, channels=3, height=640, width=640)
-    x = torch.randn(1, 3, 640, 640).to(device)
+    # Create dummy input (batch_size=1, channels=3, height, width)
+    x = torch.randn(1, 3, *input_size).to(device)
 
     # Export model to ONNX
     torch.onnx.export(
@@ -65,7 +75,7 @@ def onnx_export(params):
         x,                    # Model input
         onnx_model,          # Output file path
         export_params=True,   # Store the trained parameter weights inside the model file
-        opset_version=11,    # ONNX version to export the model to
+        opset_version=opset_version,  # ONNX version to export the model to
         do_constant_folding=True,  # Whether to execute constant folding for optimization
         input_names=['input'],     # Model's input names
         output_names=['loc', 'conf', 'landmarks'],  # Model's output names
@@ -75,9 +85,9 @@ def onnx_export(params):
                 2: 'height',
                 3: 'width'
             },
-            'loc': {0: 'batch_size'},      # Location output
-            'conf': {0: 'batch_size'},     # Confidence output
-            'landmarks': {0: 'batch_size'}  # Landmarks output
+            'loc': {0: 'batch_size', 1: 'num_priors'},      # Location output
+            'conf': {0: 'batch_size', 1: 'num_priors'},     # Confidence output
+            'landmarks': {0: 'batch_size', 1: 'num_priors'}  # Landmarks output
         }
     )
 
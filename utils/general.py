@@ -28,10 +28,10 @@ def draw_detections(original_image, detections, vis_threshold):
 
     print(f"#faces: {len(detections)}")
 
-    # Slice arrays efficiently
-    boxes = detections[:, 0:4].astype(np.int32)
-    scores = detections[:, 4]
-    landmarks = detections[:, 5:15].reshape(-1, 5, 2).astype(np.int32)
+    # Slice and cast columns once, then convert to plain Python ints for the OpenCV calls
+    boxes = detections[:, 0:4].astype(np.int32).tolist()
+    scores = detections[:, 4].tolist()
+    landmarks = detections[:, 5:15].reshape(-1, 5, 2).astype(np.int32).tolist()
 
     for box, score, landmark in zip(boxes, scores, landmarks):
         # Draw bounding box
@@ -43,5 +43,5 @@ def draw_detections(original_image, detections, vis_threshold):
         cv2.putText(original_image, text, (cx, cy), cv2.FONT_HERSHEY_DUPLEX, 0.5, TEXT_COLOR)
 
         # Draw landmarks
-        for point, color in zip(landmark, LANDMARK_COLORS):
-            cv2.circle(original_image, point, 1, color, 4)
+        for (x, y), color in zip(landmark, LANDMARK_COLORS):
+            cv2.circle(original_image, (x, y), 1, color, 4)
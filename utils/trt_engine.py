@@ -0,0 +1,79 @@
+import tensorrt as trt
+
+import torch
+from torch import Tensor
+from typing import Dict, Optional, Tuple
+
+
+_TRT_TO_TORCH_DTYPE = {
+    trt.float32: torch.float32,
+    trt.float16: torch.float16,
+    trt.int32: torch.int32,
+    trt.int8: torch.int8,
+}
+
+
+class TRTEngine:
+    """
+    Runs a serialized TensorRT engine built by `export_trt.py` as a drop-in replacement for `RetinaFace`.
+
+    Input and outputs live in CUDA tensors, so the engine consumes the same preprocessed image as the
+    PyTorch model and its outputs go straight into the existing decode code.
+    """
+
+    def __init__(self, engine_path: str, device: torch.device) -> None:
+        if device.type != "cuda":
+            raise RuntimeError("TensorRT engines require a CUDA device")
+
+        self.device = device
+        self.logger = trt.Logger(trt.Logger.WARNING)
+
+        with open(engine_path, 'rb') as f, trt.Runtime(self.logger) as runtime:
+            self.engine = runtime.deserialize_cuda_engine(f.read())
+        if self.engine is None:
+            raise RuntimeError(f"Failed to load TensorRT engine '{engine_path}'")
+
+        self.context = self.engine.create_execution_context()
+
+        tensor_names = [self.engine.get_tensor_name(i) for i in range(self.engine.num_io_tensors)]
+        self.input_name = next(
+            name for name in tensor_names if self.engine.get_tensor_mode(name) == trt.TensorIOMode.INPUT
+        )
+        self.output_names = [name for name in tensor_names if name != self.input_name]
+
+        # output buffers for the most recent input shape, reused while the shape does not change
+        self._input_shape: Optional[Tuple[int, ...]] = None
+        self._outputs: Dict[str, Tensor] = {}
+
+    def _get_outputs(self, input_shape: Tuple[int, ...]) -> Dict[str, Tensor]:
+        if input_shape != self._input_shape:
+            self._outputs = {}  # release the previous buffers before allocating new ones
+            for name in self.output_names:
+                shape = tuple(self.context.get_tensor_shape(name))
+                dtype = _TRT_TO_TORCH_DTYPE[self.engine.get_tensor_dtype(name)]
+                self._outputs[name] = torch.empty(shape, dtype=dtype, device=self.device)
+            self._input_shape = input_shape
+        return self._outputs
+
+    def __call__(self, image: Tensor) -> Tuple[Tensor, Tensor, Tensor]:
+        image = image.contiguous()
+        input_shape = tuple(image.shape)
+
+        if not self.context.set_input_shape(self.input_name, input_shape):
+            min_shape, _, max_shape = self.engine.get_tensor_profile_shape(self.input_name, 0)
+            raise ValueError(
+                f"Input shape {input_shape} is outside the engine's optimization profile: "
+                f"min {tuple(min_shape)}, max {tuple(max_shape)}. Rebuild the engine with "
+                f"export_trt.py --min-shape/--max-shape/--max-batch-size to cover it."
+            )
+        self.context.set_tensor_address(self.input_name, image.data_ptr())
+
+        outputs = self._get_outputs(input_shape)
+        for name, tensor in outputs.items():
+            self.context.set_tensor_address(name, tensor.data_ptr())
+
+        stream = torch.cuda.current_stream(self.device)
+        if not self.context.execute_async_v3(stream.cuda_stream):
+            raise RuntimeError("TensorRT inference failed")
+
+        return outputs['loc'], outputs['conf'], outputs['landmarks']
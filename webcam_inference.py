@@ -1,15 +1,24 @@
 import os
+import sys
 import cv2
+import queue
 import argparse
+import functools
+import threading
 import numpy as np
 
 import torch
+from torchvision.ops import nms
 
 from layers import PriorBox
 from config import get_config
 from models import RetinaFace
 from utils.general import draw_detections
-from utils.box_utils import decode, decode_landmarks, nms
+from utils.box_utils import decode, decode_landmarks
+
+
+# Anchors depend on the model config, input resolution and device, so generate them once per combination
+_ANCHOR_CACHE: dict[tuple[str, tuple[int, int], str], torch.Tensor] = {}
 
 
 def parse_arguments():
@@ -32,6 +41,48 @@ def parse_arguments():
         ],
         help='Backbone network architecture to use'
     )
+    parser.add_argument(
+        '--engine',
+        type=str,
+        default=None,
+        help='Path to a TensorRT engine built by export_trt.py, used instead of the PyTorch weights'
+    )
+    parser.add_argument(
+        '--fp16',
+        action='store_true',
+        help='Run the PyTorch forward pass under FP16 autocast (CUDA only)'
+    )
+    parser.add_argument(
+        '--jit',
+        action='store_true',
+        help='Trace, freeze and optimize the PyTorch model with TorchScript before inference'
+    )
+    parser.add_argument(
+        '--compile',
+        action='store_true',
+        help='Compile the PyTorch model with torch.compile(mode="reduce-overhead")'
+    )
+    parser.add_argument(
+        '--cuda-graph',
+        action='store_true',
+        help='Capture the PyTorch forward pass and decoding in a CUDA graph and replay it per frame'
+    )
+
+    # Capture settings
+    parser.add_argument(
+        '--source',
+        type=str,
+        default='0',
+        help='Webcam index, video file or GStreamer pipeline (e.g. an NVDEC decoding pipeline ending in appsink)'
+    )
+    parser.add_argument(
+        '--capture-size',
+        type=int,
+        nargs=2,
+        default=[640, 480],
+        metavar=('WIDTH', 'HEIGHT'),
+        help='Resolution requested from the webcam'
+    )
 
     # Detection settings
     parser.add_argument(
@@ -71,17 +122,125 @@ def parse_arguments():
 
 
 @torch.no_grad()
-def inference(model, image):
-    model.eval()
-    loc, conf, landmarks = model(image)
+def inference(model, image, fp16=False):
+    with torch.autocast(device_type=image.device.type, dtype=torch.float16, enabled=fp16):
+        loc, conf, landmarks = model(image)
 
-    loc = loc.squeeze(0)
-    conf = conf.squeeze(0)
-    landmarks = landmarks.squeeze(0)
+    # decoding stays in FP32
+    loc = loc.squeeze(0).float()
+    conf = conf.squeeze(0).float()
+    landmarks = landmarks.squeeze(0).float()
 
     return loc, conf, landmarks
 
 
+def get_priors(cfg, image_size, device):
+    """
+    Returns anchor boxes for the given config, image size and device, generating them only on the first call.
+
+    Args:
+        cfg (dict): Model configuration used to build the anchors.
+        image_size (tuple[int, int]): Input image size as (height, width).
+        device (torch.device): Device on which the anchors are stored.
+
+    Returns:
+        torch.Tensor: Anchor boxes, shape: [num_priors, 4].
+    """
+    key = (cfg['name'], tuple(image_size), str(device))
+    priors = _ANCHOR_CACHE.get(key)
+    if priors is None:
+        priorbox = PriorBox(cfg, image_size=image_size)
+        priors = priorbox.generate_anchors().to(device)
+        _ANCHOR_CACHE[key] = priors
+    return priors
+
+
+@torch.no_grad()
+def detect_faces(model, frame, image, rgb_mean, priors, variances, bbox_scale, landmark_scale, fp16=False):
+    """
+    Runs the static-shape part of the pipeline: normalization, forward pass and decoding.
+
+    Args:
+        model (nn.Module): Detection model.
+        frame (torch.Tensor): uint8 image on the device, shape: [H, W, 3].
+        image (torch.Tensor): Preallocated FP32 input buffer, shape: [1, 3, H, W].
+        rgb_mean (torch.Tensor): Per-channel mean, shape: [1, 3, 1, 1].
+        priors (torch.Tensor): Anchor boxes, shape: [num_priors, 4].
+        variances (list[float]): Variances of prior boxes.
+        bbox_scale (torch.Tensor): Scale from normalized to original frame box coordinates, shape: [4].
+        landmark_scale (torch.Tensor): Scale from normalized to original frame landmark coordinates, shape: [10].
+        fp16 (bool): If True, run the forward pass under FP16 autocast.
+
+    Returns:
+        tuple: Boxes [num_priors, 4], landmarks [num_priors, 10] and face scores [num_priors].
+    """
+    # cast, normalize and HWC -> 1CHW into the input buffer
+    torch.sub(frame.permute(2, 0, 1).unsqueeze(0), rgb_mean, out=image)
+
+    # forward pass
+    loc, conf, landmarks = inference(model, image, fp16=fp16)
+
+    # decode boxes and landmarks
+    boxes = decode(loc, priors, variances).mul_(bbox_scale)
+    landmarks = decode_landmarks(landmarks, priors, variances).mul_(landmark_scale)
+    scores = conf[:, 1]
+
+    return boxes, landmarks, scores
+
+
+def capture_cuda_graph(fn, static_input, warmup_iters=3):
+    """
+    Captures `fn(static_input)` in a CUDA graph.
+
+    Args:
+        fn (callable): Function with static input and output shapes.
+        static_input (torch.Tensor): Input buffer, refilled in place before each replay.
+        warmup_iters (int): Eager iterations run on a side stream before capture.
+
+    Returns:
+        tuple: The captured graph and the output tensors it writes to on every replay.
+    """
+    stream = torch.cuda.Stream()
+    stream.wait_stream(torch.cuda.current_stream())
+    with torch.cuda.stream(stream):
+        for _ in range(warmup_iters):
+            fn(static_input)
+    torch.cuda.current_stream().wait_stream(stream)
+
+    graph = torch.cuda.CUDAGraph()
+    with torch.cuda.graph(graph):
+        static_outputs = fn(static_input)
+
+    return graph, static_outputs
+
+
+def open_capture(source, capture_size=(640, 480)):
+    """
+    Opens the video source. Webcams are requested in MJPG mode, which avoids the raw YUYV
+    transfer and conversion, with a single-frame buffer so stale frames are not queued.
+
+    Args:
+        source (str): Webcam index, video file or GStreamer pipeline.
+        capture_size (tuple[int, int]): Resolution requested from the webcam as (width, height).
+
+    Returns:
+        cv2.VideoCapture: Video capture object.
+    """
+    if source.isdigit():
+        backend = cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+        cap = cv2.VideoCapture(int(source), backend)
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, capture_size[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, capture_size[1])
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    elif '!' in source:
+        cap = cv2.VideoCapture(source, cv2.CAP_GSTREAMER)
+    else:
+        cap = cv2.VideoCapture(source)
+
+    return cap
+
+
 def resize_image(frame, target_shape=(640, 640)):
     width, height = target_shape
 
@@ -105,63 +264,175 @@ def resize_image(frame, target_shape=(640, 640)):
     return image, resize_factor
 
 
+class FrameReader(threading.Thread):
+    """
+    Reads and letterboxes webcam frames on a background thread, so capture and
+    decoding overlap with inference on the main thread. The thread owns the capture
+    and releases it when it exits.
+
+    Args:
+        cap (cv2.VideoCapture): Opened video capture.
+        target_shape (tuple[int, int]): Model input size as (width, height).
+        max_queue_size (int): Number of frames buffered ahead of inference.
+    """
+
+    def __init__(self, cap, target_shape, max_queue_size=2):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.target_shape = target_shape
+        self.frames = queue.Queue(maxsize=max_queue_size)
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                image, resize_factor = resize_image(frame, target_shape=self.target_shape)
+                self.frames.put((frame, image, resize_factor))
+        finally:
+            # release from this thread so the capture is never freed while `read` is in progress
+            self.cap.release()
+            # wake up the consumer on failure or end of stream; after `stop` nobody is waiting
+            if not self.stopped.is_set():
+                self.frames.put(None)
+
+    def read(self):
+        """Returns the next `(frame, image, resize_factor)` tuple, or None if reading failed."""
+        return self.frames.get()
+
+    def stop(self):
+        self.stopped.set()
+        # unblock a pending `put` so the thread can exit
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                break
+        self.join()
+
+
 def main(params):
     cfg = get_config(params.network)
     if cfg is None:
         raise KeyError(f"Config file for {params.network} not found!")
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    rgb_mean = (104, 117, 123)
+
+    # input shapes are fixed, so let cuDNN autotune conv algorithms once; allow TF32 on Ampere+
+    torch.backends.cudnn.benchmark = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.backends.cuda.matmul.allow_tf32 = True
+
+    rgb_mean = torch.tensor([104, 117, 123], dtype=torch.float32, device=device).view(1, 3, 1, 1)
     resize_factor = 1
+    target_shape = (640, 640)  # (width, height)
 
-    # model initialization
-    model = RetinaFace(cfg=cfg)
-    model.to(device)
+    if params.engine:
+        from utils.trt_engine import TRTEngine
 
-    # loading state_dict
-    state_dict = torch.load(params.weights, map_location="cpu", weights_only=True)
-    model.load_state_dict(state_dict)
-    print("Model loaded successfully!")
+        model = TRTEngine(params.engine, device)
+        print("TensorRT engine loaded successfully!")
+    else:
+        # model initialization
+        model = RetinaFace(cfg=cfg)
+        model.to(device)
+        model.eval()
+
+        # loading state_dict
+        state_dict = torch.load(params.weights, map_location="cpu", weights_only=True)
+        model.load_state_dict(state_dict)
+        print("Model loaded successfully!")
+
+    if params.fp16 and device.type != "cuda":
+        raise ValueError("--fp16 requires a CUDA device")
+
+    if params.cuda_graph and (device.type != "cuda" or params.engine):
+        raise ValueError("--cuda-graph requires a CUDA device and the PyTorch model")
+
+    if params.jit:
+        if params.engine or params.fp16:
+            raise ValueError("--jit cannot be combined with --engine or --fp16")
+        # freezing inlines the weights, folding constants and conv-bn pairs
+        with torch.no_grad():
+            model = torch.jit.trace(model, torch.zeros((1, 3, target_shape[1], target_shape[0]), device=device))
+            model = torch.jit.freeze(model)
+            model = torch.jit.optimize_for_inference(model)
+        print("Model optimized with TorchScript!")
+
+    if params.compile:
+        if params.engine or params.jit or params.cuda_graph:
+            raise ValueError("--compile cannot be combined with --engine, --jit or --cuda-graph")
+        # static shapes: a new input size triggers a recompile
+        model = torch.compile(model, mode="reduce-overhead", fullgraph=False, dynamic=False)
 
     # Open webcam
-    cap = cv2.VideoCapture(0)
+    cap = open_capture(params.source, params.capture_size)
     if not cap.isOpened():
         print("Error: Could not open webcam.")
         return
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Error: Could not read frame.")
-            break
-
-        image, resize_factor = resize_image(frame, target_shape=(640, 640))
-
-        # Prepare image for inference
-        image = np.float32(image)
-        img_height, img_width, _ = image.shape
-        image -= rgb_mean
-        image = image.transpose(2, 0, 1)  # HWC -> CHW
-        image = torch.from_numpy(image).unsqueeze(0).to(device)
+    # every frame is resized to `target_shape`, so anchors and scales are computed once
+    img_width, img_height = target_shape
+    priors = get_priors(cfg, (img_height, img_width), device)
+    input_scale = torch.tensor([img_width, img_height] * 5, dtype=torch.float32, device=device)
+
+    # input size divided by the letterbox resize factor, updated in place when the factor changes
+    scale_resize_factor = 1
+    bbox_scale = input_scale[:4].clone()
+    landmark_scale = input_scale.clone()
+
+    # uint8 staging buffer, pinned so the host-to-device copy can run asynchronously
+    frame_pinned = torch.empty((img_height, img_width, 3), dtype=torch.uint8, pin_memory=device.type == "cuda")
+
+    # device input buffers reused across frames
+    frame_device = torch.zeros((img_height, img_width, 3), dtype=torch.uint8, device=device)
+    image_device = torch.empty((1, 3, img_height, img_width), dtype=torch.float32, device=device)
+
+    # output buffers reused across frames, rows: [x1, y1, x2, y2, score, 5 x (x, y) landmarks]
+    detections_device = torch.empty((params.post_nms_topk, 15), dtype=torch.float32, device=device)
+    detections_host = torch.empty((params.post_nms_topk, 15), dtype=torch.float32, pin_memory=device.type == "cuda")
+
+    run_detector = functools.partial(
+        detect_faces,
+        model,
+        image=image_device,
+        rgb_mean=rgb_mean,
+        priors=priors,
+        variances=cfg['variance'],
+        bbox_scale=bbox_scale,
+        landmark_scale=landmark_scale,
+        fp16=params.fp16
+    )
 
-        # forward pass
-        loc, conf, landmarks = inference(model, image)
+    graph = None
+    if params.cuda_graph:
+        graph, static_outputs = capture_cuda_graph(run_detector, frame_device)
 
-        # generate anchor boxes
-        priorbox = PriorBox(cfg, image_size=(img_height, img_width))
-        priors = priorbox.generate_anchors().to(device)
+    reader = FrameReader(cap, target_shape)
+    reader.start()
 
-        # decode boxes and landmarks
-        boxes = decode(loc, priors, cfg['variance'])
-        landmarks = decode_landmarks(landmarks, priors, cfg['variance'])
+    while True:
+        item = reader.read()
+        if item is None:
+            print("Error: Could not read frame.")
+            break
 
-        # scale adjustments
-        bbox_scale = torch.tensor([img_width, img_height] * 2, device=device)
-        boxes = (boxes * bbox_scale / resize_factor).cpu().numpy()
+        frame, image, resize_factor = item
 
-        landmark_scale = torch.tensor([img_width, img_height] * 5, device=device)
-        landmarks = (landmarks * landmark_scale / resize_factor).cpu().numpy()
+        if resize_factor != scale_resize_factor:
+            torch.div(input_scale[:4], resize_factor, out=bbox_scale)
+            torch.div(input_scale, resize_factor, out=landmark_scale)
+            scale_resize_factor = resize_factor
 
-        scores = conf.cpu().numpy()[:, 1]
+        # upload uint8 frame; normalization happens on device
+        np.copyto(frame_pinned.numpy(), image)
+        frame_device.copy_(frame_pinned, non_blocking=True)
+        if graph is not None:
+            graph.replay()
+            boxes, landmarks, scores = static_outputs
+        else:
+            boxes, landmarks, scores = run_detector(frame_device)
 
         # filter by confidence threshold
         inds = scores > params.conf_threshold
@@ -169,23 +440,28 @@ def main(params):
         landmarks = landmarks[inds]
         scores = scores[inds]
 
-        # sort by scores
-        order = scores.argsort()[::-1][:params.pre_nms_topk]
-        boxes, landmarks, scores = boxes[order], landmarks[order], scores[order]
-
-        # apply NMS
-        detections = np.hstack((boxes, scores[:, np.newaxis])).astype(np.float32, copy=False)
-        keep = nms(detections, params.nms_threshold)
-
-        detections = detections[keep]
-        landmarks = landmarks[keep]
-
-        # keep top-k detections and landmarks
-        detections = detections[:params.post_nms_topk]
-        landmarks = landmarks[:params.post_nms_topk]
-
-        # concatenate detections and landmarks
-        detections = np.concatenate((detections, landmarks), axis=1)
+        num_detections = scores.numel()
+
+        # ranking and NMS only matter when several candidates survive
+        if num_detections > 1:
+            # keep top-k scores (sorted in descending order)
+            scores, order = scores.topk(min(params.pre_nms_topk, num_detections))
+            boxes, landmarks = boxes[order], landmarks[order]
+
+            # apply NMS and keep top-k detections and landmarks
+            keep = nms(boxes, scores, params.nms_threshold)[:params.post_nms_topk]
+            boxes, landmarks, scores = boxes[keep], landmarks[keep], scores[keep]
+            num_detections = keep.numel()
+
+        if num_detections > 0:
+            # gather detections and landmarks into the output buffer, copying only the kept rows to host
+            detections = detections_device[:num_detections]
+            detections[:, 0:4] = boxes
+            detections[:, 4] = scores
+            detections[:, 5:15] = landmarks
+            detections = detections_host[:num_detections].copy_(detections).numpy()
+        else:
+            detections = detections_host[:0].numpy()
 
         # draw detections on the frame
         draw_detections(frame, detections, params.vis_threshold)
@@ -198,7 +474,7 @@ def main(params):
             break
 
     # Release the webcam and close windows
-    cap.release()
+    reader.stop()  # also releases the webcam
     cv2.destroyAllWindows()
 
 